@@ -1,40 +1,128 @@
 #analysis.py
+import collections
+import heapq
+import itertools
+from habit import calculate_streak
+
+# Generator stages: each stage consumes an iterable and yields lazily, so stages can be chained
+# over an iterator of habits (e.g. Database.iter_habits) while holding only one habit at a time.
+
+def filter_by_frequency(habits, frequency):
+    """
+    Yields the habits that have the given frequency.
+
+    Args:
+        habits (iterable): An iterable of Habit objects.
+        frequency (str): The frequency to filter habits by (e.g., 'daily', 'weekly').
+
+    Yields:
+        Habit: Each Habit object that matches the given frequency.
+    """
+    return (habit for habit in habits if habit.frequency == frequency)
+
+def with_streaks(habits):
+    """
+    Yields each habit together with its streak.
+
+    Args:
+        habits (iterable): An iterable of Habit objects.
+
+    Yields:
+        tuple: (habit, streak) for each habit.
+    """
+    return ((habit, habit.habit_streak()) for habit in habits)
+
+def streaks_from_rows(rows):
+    """
+    Yields the streak of each habit from raw completion rows.
+    The rows must be ordered by habit id, as returned by Database.iter_completions.
+    Habits with no completions have no rows, so they are not yielded.
+
+    Args:
+        rows (iterable): An iterable of (habit_id, frequency, completed_at) tuples.
+
+    Yields:
+        tuple: (habit_id, streak) for each habit with at least one completion.
+    """
+    for habit_id, group in itertools.groupby(rows, key=lambda row: row[0]):
+        first = next(group)
+        completed_dates = [first[2]] + [completed_at for _, _, completed_at in group]
+        yield habit_id, calculate_streak(first[1], completed_dates)
+
+def max_streak(streaks):
+    """
+    Returns the pair with the longest streak.
+
+    Args:
+        streaks (iterable): An iterable of (item, streak) tuples.
+
+    Returns:
+        tuple: The (item, streak) tuple with the longest streak, or None if the iterable is empty.
+    """
+    return max(streaks, key=lambda pair: pair[1], default=None)
+
+def top_streaks(streaks, k):
+    """
+    Returns the k pairs with the longest streaks, longest first.
+
+    Args:
+        streaks (iterable): An iterable of (item, streak) tuples.
+        k (int): The number of pairs to return.
+
+    Returns:
+        list: Up to k (item, streak) tuples sorted by streak in descending order.
+    """
+    return heapq.nlargest(k, streaks, key=lambda pair: pair[1])
+
+def streak_histogram(streaks):
+    """
+    Counts how many items have each streak length.
+
+    Args:
+        streaks (iterable): An iterable of (item, streak) tuples.
+
+    Returns:
+        Counter: A mapping of streak length to the number of items with that streak.
+    """
+    return collections.Counter(streak for _, streak in streaks)
+
 def get_all_habits(habits):
     """
     Returns a list of all habits.
 
     Args:
-        habits (list): A list of Habit objects.
+        habits (iterable): An iterable of Habit objects.
 
     Returns:
-        list: The same list of Habit objects.
+        list: A list of the Habit objects.
     """
-    return habits
+    return list(habits)
 
 def get_habits_ordered(habits, frequency):
     """
     Returns a list of habits filtered by their frequency and sorted alphabetically by name.
 
     Args:
-        habits (list): A list of Habit objects.
+        habits (iterable): An iterable of Habit objects.
         frequency (str): The frequency to filter habits by (e.g., 'daily', 'weekly').
 
     Returns:
         list: A sorted list of Habit objects that match the given frequency.
     """
-    return sorted([habit for habit in habits if habit.frequency == frequency], key=lambda h: h.name)
+    return sorted(filter_by_frequency(habits, frequency), key=lambda h: h.name)
 
 def longest_streak(habits):
     """
     Returns the habit with the longest streak from a list of habits.
 
     Args:
-        habits (list): A list of Habit objects.
+        habits (iterable): An iterable of Habit objects.
 
     Returns:
         Habit: The Habit object with the longest streak, or None if the list is empty.
     """
-    return max(habits, key=lambda habit: habit.habit_streak(), default=None)
+    longest = max_streak(with_streaks(habits))
+    return longest[0] if longest else None
 
 def habit_longest_streak(habit):
     """
@@ -47,5 +135,3 @@ def habit_longest_streak(habit):
         int: The longest streak (number of consecutive completions) for the given habit.
     """
     return habit.habit_streak()
-
-
@@ -0,0 +1,183 @@
+# benchmark.py
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import time
+from database import Database, PROFILES
+from habit import Habit
+
+def build_fixture(db_name, habits, completions):
+    """
+    Creates a database with the given number of habits and completions per habit in a single transaction.
+    The rows are inserted directly, so they are not added to the change log.
+
+    Args:
+        db_name (str): The database file to create.
+        habits (int): The number of habits to create.
+        completions (int): The number of completions to save per habit.
+    """
+    db = Database(db_name, profile='bulk')
+    start = datetime.datetime(2024, 1, 1)
+    with db.transaction():
+        db.conn.executemany('''INSERT INTO Habits (id, name, frequency, created_at) VALUES (?, ?, ?, ?)''',
+                            ((i + 1, f"Habit {i}", 'daily', start) for i in range(habits)))
+        db.conn.executemany('''INSERT INTO Completions (habit_id, completed_at) VALUES (?, ?)''',
+                            ((i + 1, start + datetime.timedelta(days=day))
+                             for i in range(habits) for day in range(completions)))
+    db.conn.close()
+
+def evict_from_cache(db_name):
+    """
+    Asks the operating system to drop the database file from its page cache, so the next read comes from disk.
+
+    Args:
+        db_name (str): The database file to evict.
+
+    Returns:
+        bool: True if the file was evicted, False if the platform does not support it.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    fd = os.open(db_name, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    return True
+
+def bench_get_all_habits(db_name, profile, repeat):
+    """
+    Times loading every habit with its completions, first with a cold cache and then warm.
+
+    Args:
+        db_name (str): The database file to read from.
+        profile (str): The performance profile to use, or None for the SQLite defaults.
+        repeat (int): The number of warm loads to average.
+
+    Returns:
+        tuple: (cold, warm) elapsed times in seconds; warm is the average of the repeated loads.
+    """
+    evict_from_cache(db_name)
+    db = Database(db_name, profile=profile)
+    start = time.perf_counter()
+    db.get_all_habits()
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(repeat):
+        db.get_all_habits()
+    warm = (time.perf_counter() - start) / repeat
+    db.conn.close()
+    return cold, warm
+
+def bench_scan(db_name, profile):
+    """
+    Times reading every completion inside SQLite with a cold cache, without building Python objects,
+    so the time is spent on I/O and page handling.
+
+    Args:
+        db_name (str): The database file to read from.
+        profile (str): The performance profile to use, or None for the SQLite defaults.
+
+    Returns:
+        float: The elapsed time in seconds.
+    """
+    evict_from_cache(db_name)
+    db = Database(db_name, profile=profile)
+    start = time.perf_counter()
+    db.conn.execute('''SELECT SUM(LENGTH(completed_at)) FROM Completions''').fetchone()
+    elapsed = time.perf_counter() - start
+    db.conn.close()
+    return elapsed
+
+def bench_get_habit(db_name, profile, habits, lookups):
+    """
+    Times looking up random habits by name with a cold cache, which does small random reads.
+
+    Args:
+        db_name (str): The database file to read from.
+        profile (str): The performance profile to use, or None for the SQLite defaults.
+        habits (int): The number of habits in the database.
+        lookups (int): The number of habits to look up.
+
+    Returns:
+        float: The elapsed time in seconds.
+    """
+    names = [f"Habit {random.Random(i).randrange(habits)}" for i in range(lookups)]
+    evict_from_cache(db_name)
+    db = Database(db_name, profile=profile)
+    start = time.perf_counter()
+    for name in names:
+        db.get_habit(name)
+    elapsed = time.perf_counter() - start
+    db.conn.close()
+    return elapsed
+
+def bench_ingest(db_name, profile, completions, batched):
+    """
+    Times saving completions for one habit, either committing each one as the CLI does or all in one transaction.
+
+    Args:
+        db_name (str): The database file to write to.
+        profile (str): The performance profile to use, or None for the SQLite defaults.
+        completions (int): The number of completions to save.
+        batched (bool): Whether to save all completions in a single transaction.
+
+    Returns:
+        float: The elapsed time in seconds.
+    """
+    db = Database(db_name, profile=profile)
+    habit = Habit("Ingest", 'daily')
+    db.save_habit(habit)
+    start = time.perf_counter()
+    if batched:
+        with db.transaction():
+            for day in range(completions):
+                habit.habit_completed_dates.append(datetime.datetime(2024, 1, 1) + datetime.timedelta(days=day))
+                db.save_completion(habit)
+    else:
+        for day in range(completions):
+            habit.habit_completed_dates.append(datetime.datetime(2024, 1, 1) + datetime.timedelta(days=day))
+            db.save_completion(habit)
+    elapsed = time.perf_counter() - start
+    db.conn.close()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the database performance profiles.")
+    parser.add_argument('--habits', type=int, default=1000, help="Number of habits in the read fixture.")
+    parser.add_argument('--completions', type=int, default=2000, help="Number of completions per habit in the read fixture.")
+    parser.add_argument('--fixture', help="Existing database file to read from instead of building one.")
+    parser.add_argument('--repeat', type=int, default=3, help="Number of warm loads of all habits to average.")
+    parser.add_argument('--lookups', type=int, default=200, help="Number of random habits to look up.")
+    parser.add_argument('--commits', type=int, default=2000, help="Number of completions to ingest one commit at a time.")
+    parser.add_argument('--batch', type=int, default=100000, help="Number of completions to ingest in one transaction.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixture = args.fixture
+        if fixture is None:
+            fixture = os.path.join(tmp, 'fixture.db')
+            start = time.perf_counter()
+            build_fixture(fixture, args.habits, args.completions)
+            print(f"Built fixture with {args.habits * args.completions} completions "
+                  f"({os.path.getsize(fixture) / 2**20:.0f} MiB) in {time.perf_counter() - start:.1f}s")
+        habits = Database(fixture).conn.execute('SELECT COUNT(*) FROM Habits').fetchone()[0]
+        if not evict_from_cache(fixture):
+            print("Cannot evict the fixture from the page cache on this platform; cold reads are warm")
+
+        print(f"{'profile':<12} {'scan cold (s)':>14} {'all cold (s)':>13} {'all warm (s)':>13} {'lookups cold (s)':>17} "
+              f"{'per-commit (s)':>15} {'batched (s)':>12}")
+        for profile in [None, *PROFILES]:
+            scan = bench_scan(fixture, profile)
+            cold, warm = bench_get_all_habits(fixture, profile, args.repeat)
+            lookups = bench_get_habit(fixture, profile, habits, args.lookups)
+            per_commit = bench_ingest(os.path.join(tmp, f'{profile}-commits.db'), profile, args.commits, False)
+            batched = bench_ingest(os.path.join(tmp, f'{profile}-batch.db'), profile, args.batch, True)
+            print(f"{profile or 'default':<12} {scan:>14.3f} {cold:>13.3f} {warm:>13.3f} {lookups:>17.3f} "
+                  f"{per_commit:>15.3f} {batched:>12.3f}")
+
+if __name__ == '__main__':
+    main()
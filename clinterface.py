@@ -1,48 +1,113 @@
 
+import csv
+import itertools
+import shlex
+import time
 import click
 from database import Database
 from habit import HabitOrganizer
-from analysis import  get_all_habits, get_habits_ordered, longest_streak, habit_longest_streak
+from analysis import filter_by_frequency, with_streaks, max_streak, habit_longest_streak
 
 # Define a Click command group to group the CLI commands
 @click.group()
 def cli():
     pass
 
-# Command to add a new habit
+def get_organizer(snapshot=False):
+    """
+    Returns the HabitOrganizer shared by a running shell, or a new one on its own database connection.
+
+    Args:
+        snapshot (bool): Whether to open a point-in-time snapshot instead of the live database.
+
+    Returns:
+        HabitOrganizer: The organizer to run the command against.
+    """
+    organizer = click.get_current_context().obj
+    if organizer is None or snapshot:
+        organizer = HabitOrganizer(Database(snapshot=snapshot))  # Create a HabitOrganizer to manage habits
+    return organizer
+
+def read_habits_file(habits_file):
+    """
+    Reads the habits to add from a CSV file with one "name,frequency" row per habit.
+    Blank lines and a "name,frequency" header row are skipped.
+
+    Args:
+        habits_file (file): The open CSV file.
+
+    Returns:
+        list: A list of (name, frequency) tuples.
+
+    Raises:
+        click.BadParameter: If a row does not have exactly a name and a frequency, or the file has no habits.
+    """
+    reader = csv.reader(habits_file)
+    habits = []
+    bad_lines = []
+    for row in reader:
+        row = [field.strip() for field in row]
+        if not any(row):
+            continue
+        if len(row) != 2 or not all(row):
+            bad_lines.append(f"line {reader.line_num}: {','.join(row)!r}")
+            continue
+        if not habits and not bad_lines and [field.lower() for field in row] == ['name', 'frequency']:
+            continue  # Skip the header row
+        habits.append((row[0], row[1]))
+    if bad_lines:
+        raise click.BadParameter("expected 'name,frequency' on " + "; ".join(bad_lines), param_hint='--from-file')
+    if not habits:
+        raise click.BadParameter(f"No habits found in {habits_file.name}", param_hint='--from-file')
+    return habits
+
+# Command to add new habits, either one from the arguments or many from a file
 @click.command()
-@click.argument('name')
-@click.argument('frequency')
-def add_habit(name, frequency):
+@click.argument('name', required=False)
+@click.argument('frequency', required=False)
+@click.option('--from-file', type=click.File('r'),
+              help='CSV file with one "name,frequency" row per habit. A "name,frequency" header row is skipped.')
+def add_habit(name, frequency, from_file):
     """
-    Adds a new habit with the specified name and frequency.
+    Adds a new habit with the specified name and frequency, or every habit listed in a file.
+    Habits read from a file are added in a single transaction.
     
     Args:
         name (str): The name of the habit.
         frequency (str): The frequency of the habit (e.g., 'daily', 'weekly').
+        from_file (file, optional): A CSV file with one "name,frequency" row per habit.
+            An optional "name,frequency" header row is skipped.
     """
-    db = Database()  # Initialize the database connection
-    organizer = HabitOrganizer(db)  # Create a HabitOrganizer to manage habits
-    organizer.create_habit(name, frequency)  # Create the habit
-    click.echo(f"Habit '{name}' with frequency '{frequency}' added!")  # Confirm habit addition
+    if from_file:
+        if name or frequency:
+            raise click.UsageError("NAME and FREQUENCY cannot be used together with --from-file")
+        habits = read_habits_file(from_file)
+    elif name and frequency:
+        habits = [(name, frequency)]
+    else:
+        raise click.UsageError("Provide NAME and FREQUENCY or --from-file")
+    organizer = get_organizer()
+    for habit in organizer.create_habits(habits):  # Create the habits
+        click.echo(f"Habit '{habit.name}' with frequency '{habit.frequency}' added!")  # Confirm habit addition
 
-# Command to mark a habit as completed
+# Command to mark one or more habits as completed
 @click.command()
-@click.argument('name')
-def habit_completed(name):
+@click.argument('names', nargs=-1, required=True)
+def habit_completed(names):
     """
-    Marks a habit as completed for the current date.
+    Marks one or more habits as completed for the current date, in a single transaction.
+    If one of the habits does not exist, none of them are marked as completed.
     
     Args:
-        name (str): The name of the habit to mark as completed.
+        names (tuple): The names of the habits to mark as completed.
     """
-    db = Database()  # Initialize the database connection
-    organizer = HabitOrganizer(db)  # Create a HabitOrganizer to manage habits
+    organizer = get_organizer()
     try:
-        organizer.habit_completed(name)  # Mark the habit as completed
-        click.echo(f"Habit '{name}' completed!")  # Confirm completion
+        organizer.habits_completed(names)  # Mark the habits as completed
+        for name in names:
+            click.echo(f"Habit '{name}' completed!")  # Confirm completion
     except ValueError as e:
-        click.echo(e)  # Display an error message if the habit doesn't exist
+        click.echo(e)  # Display an error message if a habit doesn't exist
 
 # Command to delete a habit
 @click.command()
@@ -54,63 +119,78 @@ def delete_habit(name):
     Args:
         name (str): The name of the habit to delete.
     """
-    db = Database()  # Initialize the database connection
-    organizer = HabitOrganizer(db)  # Create a HabitOrganizer to manage habits
+    organizer = get_organizer()
     try:
         organizer.delete_habit(name)  # Delete the habit
         click.echo(f"Habit '{name}' deleted!")  # Confirm deletion
     except ValueError as e:
         click.echo(e)  # Display an error message if the habit doesn't exist
 
+def echo_streaks(streaks):
+    """
+    Displays each habit with its streak as it passes through, so the streaks can be aggregated in the same pass.
+
+    Args:
+        streaks (iterable): An iterable of (habit, streak) tuples.
+
+    Yields:
+        tuple: The same (habit, streak) tuples.
+    """
+    for habit, streak in streaks:
+        click.echo(f"- {habit.name} (Streak: {streak} days)")  # Display habit names and streaks
+        yield habit, streak
+
 # Command to analyze and display habits, optionally filtered by frequency
 @click.command()
 @click.argument('frequency', required=False)
-def analyze_habits(frequency=None):
+@click.option('--snapshot', is_flag=True, help='Analyze a read-only point-in-time copy of the database.')
+def analyze_habits(frequency=None, snapshot=False):
     """
     Analyzes and displays all habits, optionally filtering by frequency.
     
     Args:
         frequency (str, optional): The frequency to filter habits by (e.g., 'daily', 'weekly').
+        snapshot (bool): Whether to analyze a point-in-time snapshot instead of the live database.
     """
-    db = Database()  # Initialize the database connection
-    organizer = HabitOrganizer(db)  # Create a HabitOrganizer to manage habits
-    habits = organizer.get_all_habits()  # Retrieve all habits
+    organizer = get_organizer(snapshot)
+    habits = organizer.iter_habits()  # Stream habits one at a time
+    first_habit = next(habits, None)
 
-    if not habits:
+    if first_habit is None:
         click.echo("No habits available")  # Notify if no habits are found
         return
+    habits = itertools.chain([first_habit], habits)
 
     if frequency:
-        filtered_habits = get_habits_ordered(habits, frequency)  # Filter habits by frequency
-        if filtered_habits:
+        names = sorted(habit.name for habit in filter_by_frequency(habits, frequency))  # Filter habits by frequency
+        if names:
             click.echo(f"Habits with frequency '{frequency}':")
-            for habit in filtered_habits:
-                click.echo(f"- {habit.name}")
+            for name in names:
+                click.echo(f"- {name}")
         else:
             click.echo(f"No habits with frequency '{frequency}' are available")
     else:
         click.echo("All habits:")
-        for habit in habits:
-            click.echo(f"- {habit.name} (Streak: {habit.habit_streak()} days)")  # Display habit names and streaks
+        habit_with_longest_streak = max_streak(echo_streaks(with_streaks(habits)))  # Find the habit with the longest streak
 
-        habit_with_longest_streak = longest_streak(habits)  # Find the habit with the longest streak
         if habit_with_longest_streak:
-            click.echo(f"\nThe habit with the longest streak: {habit_with_longest_streak.name} ({habit_with_longest_streak.habit_streak()} days)")
+            click.echo(f"\nThe habit with the longest streak: {habit_with_longest_streak[0].name} ({habit_with_longest_streak[1]} days)")
         else:
             click.echo("No habit has been completed yet.")
 
 # Command to analyze and display a specific habit's longest streak            
 @click.command()
 @click.argument('name')
-def analyze_habit(name):
+@click.option('--snapshot', is_flag=True, help='Analyze a read-only point-in-time copy of the database.')
+def analyze_habit(name, snapshot=False):
     """
     Analyzes and displays the longest streak for a specific habit.
     
     Args:
         name (str): The name of the habit to analyze.
+        snapshot (bool): Whether to analyze a point-in-time snapshot instead of the live database.
     """
-    db = Database()  # Initialize the database connection
-    organizer = HabitOrganizer(db)  # Create a HabitOrganizer to manage habits
+    organizer = get_organizer(snapshot)
     habit = organizer.get_habit(name)  # Retrieve the habit by name
     
     if habit:
@@ -122,11 +202,74 @@ def analyze_habit(name):
 
     # Implement analysis using analytics module and display the results here
 
+# Command to stream changes from the change log
+@click.command()
+@click.option('--since', default=0, type=int, help='Only show changes after this sequence number.')
+@click.option('--interval', default=1.0, type=float, help='Seconds to wait between polls.')
+@click.option('--once', is_flag=True, help='Print the pending changes and exit instead of polling.')
+def watch(since, interval, once):
+    """
+    Prints changes to habits as they are recorded, starting after a given sequence number.
+    
+    Args:
+        since (int): The last sequence number already seen.
+        interval (float): The number of seconds to wait between polls.
+        once (bool): Whether to exit after printing the pending changes.
+    """
+    db = get_organizer().database
+    while True:
+        for change in db.changes_since(since):
+            if change['operation'] == 'save_habit':
+                details = change['frequency']
+            elif change['operation'] == 'save_completion':
+                details = change['completed_at'].isoformat()
+            else:
+                details = ''
+            click.echo(f"{change['seq']}\t{change['changed_at'].isoformat()}\t{change['operation']}\t"
+                       f"{change['habit_name']}\t{details}")  # Display each change
+            since = change['seq']  # Remember the last sequence number seen
+        if once:
+            break
+        time.sleep(interval)  # Wait before polling again
+
+# Command to run many commands against a single open database
+@click.command()
+@click.argument('script', type=click.File('r'), default='-')
+def shell(script):
+    """
+    Runs commands read one per line from a file or stdin against a single open database,
+    printing the results of each command as it runs. Blank lines and lines starting with '#' are skipped.
+    A command that fails is reported with its line number and the script carries on with the next line.
+    The watch command only runs with --once, so it cannot block the script. Ctrl-C ends the shell.
+    
+    Args:
+        script (file): The file to read commands from. Defaults to stdin.
+    """
+    organizer = HabitOrganizer(Database())  # Shared by every command in the script
+    for line_number, line in enumerate(script, start=1):
+        try:
+            args = shlex.split(line, comments=True)
+            if not args:
+                continue
+            if args[0] == 'shell':
+                raise click.UsageError("The shell command cannot be nested")
+            if args[0] == 'watch' and '--once' not in args:
+                raise click.UsageError("The watch command needs --once inside the shell")
+            cli.main(args, prog_name='shell', standalone_mode=False, obj=organizer)
+        except click.Abort:
+            raise  # Ctrl-C ends the shell
+        except click.ClickException as e:
+            click.echo(f"Line {line_number}: {e.format_message()}", err=True)  # Report the error and carry on
+        except Exception as e:
+            click.echo(f"Line {line_number}: {e}", err=True)  # Report the error and carry on
+
 cli.add_command(add_habit)
 cli.add_command(habit_completed)
 cli.add_command(delete_habit)
 cli.add_command(analyze_habits)
 cli.add_command(analyze_habit)
+cli.add_command(watch)
+cli.add_command(shell)
 
 # Main entry point for the CLI
 if __name__ == '__main__':
@@ -1,7 +1,50 @@
 #database.py
 import sqlite3
 from habit import Habit
+import contextlib
 import datetime
+import itertools
+import os
+import pathlib
+import tempfile
+import time
+
+# Performance profiles for Database(profile=...). Each maps SQLite pragmas to their values, plus the
+# size of the prepared-statement cache passed to sqlite3.connect. A negative cache_size is in KiB.
+PROFILES = {
+    # Fast ingest of many completions: skip fsyncs and keep temporary data in memory
+    'bulk': {
+        'page_size': 4096,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+        'temp_store': 'MEMORY',
+        'synchronous': 'OFF',
+        'cached_statements': 256,
+    },
+    # Short CLI commands: a modest cache while keeping writes durable
+    'interactive': {
+        'page_size': 4096,
+        'mmap_size': 64 * 1024 * 1024,
+        'cache_size': -8 * 1024,
+        'temp_store': 'MEMORY',
+        'synchronous': 'NORMAL',
+        'cached_statements': 128,
+    },
+    # Large read-heavy scans: map as much of the file as possible and use a large page cache
+    'analytics': {
+        'page_size': 16384,
+        'mmap_size': 1024 * 1024 * 1024,
+        'cache_size': -256 * 1024,
+        'temp_store': 'MEMORY',
+        'synchronous': 'NORMAL',
+        'cached_statements': 256,
+    },
+}
+
+# Snapshots are copied this many pages at a time, and give up after waiting this many seconds for a lock,
+# matching the default busy timeout of sqlite3.connect.
+SNAPSHOT_PAGES_PER_STEP = 1024
+SNAPSHOT_BUSY_TIMEOUT = 5.0
 
 class Database:
     """
@@ -9,16 +52,145 @@ class Database:
 
     Attributes:
         conn (sqlite3.Connection): The database connection object.
+        db_name (str): The name of the database file.
+        snapshot (bool): Whether conn is a read-only snapshot of the database file.
+        snapshot_in_memory (bool): Whether the snapshot is held in memory rather than in a temporary file.
+        refresh_interval (float): Seconds after which a snapshot is refreshed on the next read, or None to never refresh.
+        profile (str): The name of the performance profile in PROFILES, or None for the SQLite defaults.
     """
-    def __init__(self, db_name='habits.db'):
+    def __init__(self, db_name='habits.db', snapshot=False, refresh_interval=None, profile=None,
+                 snapshot_in_memory=False):
         """
         Initializes a new Database instance and connects to the specified SQLite database.
 
         Args:
             db_name (str): The name of the database file. Defaults to 'habits.db'.
+            snapshot (bool): If True, copy the database into a read-only snapshot instead of
+                using the live file, so long analyses do not hold locks on it. Defaults to False.
+            refresh_interval (float, optional): Seconds after which the snapshot is refreshed on the next read.
+                Only used when snapshot is True. Defaults to None (never refresh automatically).
+            profile (str, optional): The performance profile to apply ('bulk', 'interactive' or 'analytics').
+                Defaults to None (SQLite defaults).
+            snapshot_in_memory (bool): If True, hold the snapshot in memory for fast repeated queries instead of
+                in a temporary file. Only used when snapshot is True. Defaults to False.
+
+        Raises:
+            ValueError: If the profile does not exist, or if a snapshot of an in-memory database is requested.
+            sqlite3.OperationalError: If the snapshot cannot be taken because the database stays locked.
+        """
+        if profile is not None and profile not in PROFILES:
+            raise ValueError(f"Profile '{profile}' does not exist")
+        if snapshot and db_name == ':memory:':
+            raise ValueError("A snapshot cannot be taken of an in-memory database")
+        self.db_name = db_name
+        self.snapshot = snapshot
+        self.refresh_interval = refresh_interval
+        self.profile = profile
+        self.in_transaction = False
+        self.in_read_transaction = False
+        self.snapshot_in_memory = snapshot_in_memory
+        if snapshot:
+            self.snapshot_dir = None if snapshot_in_memory else tempfile.TemporaryDirectory()
+            self.snapshot_path = None
+            self.snapshot_count = 0
+            self.refresh_snapshot()
+        else:
+            self.conn = self.connect(db_name)
+            self.apply_profile()
+            self.create_tables()
+
+    def connect(self, db_name):
+        """
+        Opens a connection with the prepared-statement cache size of the selected performance profile.
+
+        Args:
+            db_name (str): The name of the database file.
+
+        Returns:
+            sqlite3.Connection: The new connection.
+        """
+        return sqlite3.connect(db_name, cached_statements=PROFILES.get(self.profile, {}).get('cached_statements', 128))
+
+    def apply_profile(self):
+        """
+        Applies the pragmas of the selected performance profile to the connection.
+        The page size only takes effect on a new database file, and is left alone for snapshots
+        because the backup copies the page size of the source file.
+        """
+        for pragma, value in PROFILES.get(self.profile, {}).items():
+            if pragma == 'cached_statements' or (pragma == 'page_size' and self.snapshot):
+                continue
+            self.conn.execute(f'PRAGMA {pragma} = {value}')
+
+    def refresh_snapshot(self):
+        """
+        Copies a consistent point-in-time image of the database file into a new snapshot and switches to it.
+        The file is opened read-only and copied with the SQLite backup API into a temporary file, or into
+        memory if snapshot_in_memory is set. Cursors still open on the previous snapshot keep reading from it.
+
+        Raises:
+            sqlite3.OperationalError: If the database stays locked for longer than SNAPSHOT_BUSY_TIMEOUT.
         """
-        self.conn = sqlite3.connect(db_name)
+        if self.snapshot_in_memory:
+            snapshot_path = None
+            conn = self.connect(':memory:')
+        else:
+            self.snapshot_count += 1
+            snapshot_path = os.path.join(self.snapshot_dir.name, f'snapshot-{self.snapshot_count}.db')
+            conn = self.connect(snapshot_path)
+        # A missing file gives an empty snapshot rather than creating the live database
+        if os.path.exists(self.db_name):
+            # The progress callback handles waiting for locks, so the source connection does not wait itself
+            source = sqlite3.connect(pathlib.Path(self.db_name).resolve().as_uri() + '?mode=ro', uri=True, timeout=0)
+            try:
+                source.backup(conn, pages=SNAPSHOT_PAGES_PER_STEP, progress=self.backup_progress())
+            except BaseException:
+                conn.close()
+                if snapshot_path:
+                    os.remove(snapshot_path)  # Discard the partial copy
+                raise
+            finally:
+                source.close()
+        old_snapshot_path = self.snapshot_path
+        self.conn = conn
+        self.snapshot_path = snapshot_path
+        self.apply_profile()
+        # Make sure the tables exist even if the file predates them, then reject writes
         self.create_tables()
+        self.conn.execute('PRAGMA query_only = ON')
+        self.snapshot_taken_at = time.monotonic()
+        if old_snapshot_path:
+            with contextlib.suppress(OSError):
+                os.remove(old_snapshot_path)  # Open cursors keep the file readable until they are done
+
+    def backup_progress(self):
+        """
+        Returns a progress callback for the backup API that gives up once the source database
+        has been locked for longer than SNAPSHOT_BUSY_TIMEOUT.
+
+        Returns:
+            function: The callback taking (status, remaining, total).
+        """
+        busy_since = None
+
+        def progress(status, remaining, total):
+            nonlocal busy_since
+            if status in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED):
+                busy_since = busy_since or time.monotonic()
+                if time.monotonic() - busy_since > SNAPSHOT_BUSY_TIMEOUT:
+                    raise sqlite3.OperationalError("database is locked")
+            else:
+                busy_since = None
+
+        return progress
+
+    def refresh_if_stale(self):
+        """
+        Refreshes the snapshot if it is older than refresh_interval. Does nothing for live connections.
+        """
+        if self.snapshot and not self.in_read_transaction and self.refresh_interval is not None and \
+                time.monotonic() - self.snapshot_taken_at >= self.refresh_interval:
+            self.refresh_snapshot()
 
     def create_tables(self):
         """
@@ -39,6 +211,84 @@ class Database:
                                     completed_at DATETIME NOT NULL,
                                     FOREIGN KEY (habit_id) REFERENCES Habits(id)
                                  )''')
+            # Index completions by habit so they can be read in order without sorting
+            self.conn.execute('''CREATE INDEX IF NOT EXISTS idx_completions_habit
+                                 ON Completions (habit_id, id)''')
+            # Create the Changes table (change log read by changes_since)
+            changes_exists = self.conn.execute('''SELECT 1 FROM sqlite_master
+                                                 WHERE type = 'table' AND name = ?''', ('Changes',)).fetchone()
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS Changes (
+                                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                                    operation TEXT NOT NULL,
+                                    habit_name TEXT NOT NULL,
+                                    frequency TEXT,
+                                    created_at DATETIME,
+                                    completed_at DATETIME,
+                                    changed_at DATETIME NOT NULL
+                                 )''')
+            if not changes_exists:
+                # Backfill the log with the existing data so it describes the whole database
+                now = datetime.datetime.now()
+                self.conn.execute('''INSERT INTO Changes (operation, habit_name, frequency, created_at, changed_at)
+                                     SELECT 'save_habit', name, frequency, created_at, ? FROM Habits ORDER BY id''',
+                                  (now,))
+                self.conn.execute('''INSERT INTO Changes (operation, habit_name, completed_at, changed_at)
+                                     SELECT 'save_completion', h.name, c.completed_at, ?
+                                     FROM Completions c JOIN Habits h ON h.id = c.habit_id
+                                     ORDER BY c.habit_id, c.id''', (now,))
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Groups several writes into a single transaction, committed when the outermost block exits
+        and rolled back if it raises. Nested blocks join the enclosing transaction.
+        """
+        if self.in_transaction:
+            yield
+            return
+        self.in_transaction = True
+        try:
+            with self.conn:
+                yield
+        finally:
+            self.in_transaction = False
+
+    @contextlib.contextmanager
+    def read_transaction(self):
+        """
+        Groups several reads so they all see the same state of the database.
+        A stale snapshot is refreshed once at the start rather than between the reads.
+        """
+        if self.in_read_transaction:
+            yield
+            return
+        self.refresh_if_stale()
+        self.in_read_transaction = True
+        started = not self.conn.in_transaction
+        try:
+            if started:
+                self.conn.execute('BEGIN')
+            yield
+        finally:
+            if started:
+                self.conn.commit()
+            self.in_read_transaction = False
+
+    def log_change(self, operation, habit_name, frequency=None, created_at=None, completed_at=None):
+        """
+        Records a change in the Changes table. Must be called inside the same transaction
+        as the write it describes so that the log and the data never disagree.
+
+        Args:
+            operation (str): The kind of change (e.g., 'save_habit', 'save_completion', 'delete_habit').
+            habit_name (str): The name of the habit that changed.
+            frequency (str, optional): The frequency of a saved habit.
+            created_at (datetime, optional): The creation date of a saved habit.
+            completed_at (datetime, optional): The date of a saved completion.
+        """
+        self.conn.execute('''INSERT INTO Changes (operation, habit_name, frequency, created_at, completed_at, changed_at)
+                             VALUES (?, ?, ?, ?, ?, ?)''',
+                          (operation, habit_name, frequency, created_at, completed_at, datetime.datetime.now()))
             
     def save_habit(self, habit):
         """
@@ -50,14 +300,16 @@ class Database:
         # Check if the habit already exists in the database
         existing_habit = self.conn.execute('''SELECT id FROM Habits WHERE name = ?''', (habit.name,)).fetchone()
         if existing_habit:
-            with self.conn:
+            with self.transaction():
                 self.conn.execute('''UPDATE Habits SET frequency = ?, created_at = ? WHERE id = ?''', 
                                   (habit.frequency, habit.created_at, existing_habit[0]))
+                self.log_change('save_habit', habit.name, frequency=habit.frequency, created_at=habit.created_at)
          # Insert the new habit
         else:
-            with self.conn:
+            with self.transaction():
                 self.conn.execute('''INSERT INTO Habits (name, frequency, created_at)
                                  VALUES (?, ?, ?)''', (habit.name, habit.frequency, habit.created_at))
+                self.log_change('save_habit', habit.name, frequency=habit.frequency, created_at=habit.created_at)
                 
                 
     def get_habit(self, name):
@@ -70,6 +322,7 @@ class Database:
         Returns:
             Habit: The Habit instance if found, or None if not found.
         """
+        self.refresh_if_stale()
         # Query the habit by name
         cursor = self.conn.execute('''SELECT id, name, frequency, created_at FROM Habits WHERE name = ?''', (name,))
         row = cursor.fetchone()
@@ -94,10 +347,11 @@ class Database:
         """
         # Get the habit ID from the database
         habit_id = self.conn.execute('''SELECT id FROM Habits WHERE name = ?''', (habit.name,)).fetchone()[0]
-        with self.conn:
+        with self.transaction():
             # Insert the completion date into the Completions table
             self.conn.execute('''INSERT INTO Completions (habit_id, completed_at)
                                  VALUES (?, ?)''', (habit_id, habit.habit_completed_dates[-1]))
+            self.log_change('save_completion', habit.name, completed_at=habit.habit_completed_dates[-1])
             
     def delete_habit(self, name):
         """
@@ -112,11 +366,12 @@ class Database:
         # Get the habit ID from the database
         habit_id = self.conn.execute('''SELECT id FROM Habits WHERE name = ?''', (name,)).fetchone()
         if habit_id:
-            with self.conn:
+            with self.transaction():
                  # Delete the habit from the Habits table
                 self.conn.execute('''DELETE FROM Habits WHERE id = ?''', (habit_id[0],))
                   # Delete the associated completions from the Completions table
                 self.conn.execute('''DELETE FROM Completions WHERE habit_id = ?''', (habit_id[0],))
+                self.log_change('delete_habit', name)
         else:
             raise ValueError(f"Habit '{name}' does not exist")
 
@@ -127,17 +382,91 @@ class Database:
         Returns:
             list: A list of all Habit instances stored in the database.
         """
-        # Query all habits from the database
-        cursor = self.conn.execute("SELECT id, name, frequency, created_at FROM Habits")
-        habits = []
-        for row in cursor:
-             # Create a Habit instance from the retrieved data
+        return list(self.iter_habits())
+
+    def iter_habits(self):
+        """
+        Yields all habits from the database one at a time, including their completion records.
+        Habits and completions are read with a single ordered query, so only one habit is held in memory at a time.
+
+        Yields:
+            Habit: Each Habit instance stored in the database.
+        """
+        self.refresh_if_stale()
+        # Query all habits joined with their completions, grouped by habit
+        cursor = self.conn.execute('''SELECT h.id, h.name, h.frequency, h.created_at, c.completed_at
+                                      FROM Habits h LEFT JOIN Completions c ON c.habit_id = h.id
+                                      ORDER BY h.id, c.id''')
+        for _, rows in itertools.groupby(cursor, key=lambda row: row[0]):
+            row = next(rows)
+            # Create a Habit instance from the retrieved data
             habit = Habit(row[1], row[2])
             habit.created_at = datetime.datetime.fromisoformat(row[3])
-              # Retrieve completion dates for each habit
-            completion_cursor = self.conn.execute("SELECT completed_at FROM Completions WHERE habit_id = ?", (row[0],))
-            for completion_row in completion_cursor:
-                habit.habit_completed_dates.append(datetime.datetime.fromisoformat(completion_row[0]))
-            habits.append(habit)
-        return habits
-        
\ No newline at end of file
+            # Add the completion dates for the habit (None when it has no completions)
+            for completion_row in itertools.chain([row], rows):
+                if completion_row[4] is not None:
+                    habit.habit_completed_dates.append(datetime.datetime.fromisoformat(completion_row[4]))
+            yield habit
+
+    def iter_completions(self):
+        """
+        Yields the raw completion records, with the frequency of their habit, ordered by habit and completion order.
+
+        Yields:
+            tuple: (habit_id, frequency, completed_at) for each completion.
+        """
+        self.refresh_if_stale()
+        cursor = self.conn.execute('''SELECT c.habit_id, h.frequency, c.completed_at
+                                      FROM Completions c JOIN Habits h ON h.id = c.habit_id
+                                      ORDER BY c.habit_id, c.id''')
+        for row in cursor:
+            yield row[0], row[1], datetime.datetime.fromisoformat(row[2])
+
+    def current_seq(self):
+        """
+        Returns the sequence number of the latest change, or 0 if nothing has been recorded.
+
+        Returns:
+            int: The latest sequence number.
+        """
+        self.refresh_if_stale()
+        return self.conn.execute('''SELECT COALESCE(MAX(seq), 0) FROM Changes''').fetchone()[0]
+
+    def get_all_habits_with_seq(self):
+        """
+        Retrieves all habits together with the sequence number of the latest change they include.
+        Both are read in a single read transaction, so a consumer can load everything once and then
+        follow changes_since(seq) without missing or repeating a change.
+
+        Returns:
+            tuple: (habits, seq) where habits is a list of Habit instances and seq is an int.
+        """
+        with self.read_transaction():
+            return self.get_all_habits(), self.current_seq()
+
+    def changes_since(self, seq=0):
+        """
+        Yields the changes recorded after the given sequence number, oldest first.
+        Each change carries the data it wrote, so consumers do not need to reload the habit.
+        Rows are streamed from the cursor so the cost is proportional to the number of changes.
+
+        Args:
+            seq (int): The last sequence number already seen by the caller. Defaults to 0 (all changes).
+
+        Yields:
+            dict: The change, with the keys 'seq', 'operation', 'habit_name', 'changed_at', and 'frequency'
+                and 'created_at' for 'save_habit' or 'completed_at' for 'save_completion' (None otherwise).
+        """
+        self.refresh_if_stale()
+        cursor = self.conn.execute('''SELECT seq, operation, habit_name, frequency, created_at, completed_at, changed_at
+                                      FROM Changes WHERE seq > ? ORDER BY seq''', (seq,))
+        for row in cursor:
+            yield {
+                'seq': row[0],
+                'operation': row[1],
+                'habit_name': row[2],
+                'frequency': row[3],
+                'created_at': datetime.datetime.fromisoformat(row[4]) if row[4] else None,
+                'completed_at': datetime.datetime.fromisoformat(row[5]) if row[5] else None,
+                'changed_at': datetime.datetime.fromisoformat(row[6]),
+            }
@@ -1,6 +1,34 @@
 # habit.py
 import datetime
 
+def calculate_streak(frequency, completed_dates):
+    """
+    Calculates the current streak of consecutive completions from a list of completion dates.
+
+    Args:
+        frequency (str): The frequency of the habit (e.g., 'daily', 'weekly').
+        completed_dates (list): The completion dates in the order they were recorded.
+
+    Returns:
+        int: The length of the current streak.
+    """
+    if not completed_dates:
+        return 0
+    habit_streak = 1
+    for i in range(1, len(completed_dates)):
+        delta = completed_dates[i] - completed_dates[i - 1]
+        if frequency == 'daily':
+            if delta.days == 1:
+                habit_streak += 1
+            else:
+                habit_streak = 1  # Reset streak if a day is missed
+        elif frequency == 'weekly':
+            if delta.days <= 7:
+                habit_streak += 1
+            else:
+                habit_streak = 1  # Reset streak if a week is missed
+    return habit_streak
+
 class Habit:
     """
     A class to represent a habit.
@@ -37,22 +65,7 @@ class Habit:
         Returns:
             int: The length of the current streak.
         """
-        if not self.habit_completed_dates:
-            return 0
-        habit_streak = 1
-        for i in range(1, len(self.habit_completed_dates)):
-            delta = self.habit_completed_dates[i] - self.habit_completed_dates[i - 1]
-            if self.frequency == 'daily':
-                if delta.days == 1:
-                    habit_streak += 1
-                else:
-                    habit_streak = 1  # Reset streak if a day is missed
-            elif self.frequency == 'weekly':
-                if delta.days <= 7:
-                    habit_streak += 1
-                else:
-                    habit_streak = 1  # Reset streak if a week is missed
-        return habit_streak
+        return calculate_streak(self.frequency, self.habit_completed_dates)
     
     def completion_missed(self):
         """
@@ -109,6 +122,19 @@ class HabitOrganizer:
         self.database.save_habit(habit)
         return habit
     
+    def create_habits(self, habits):
+        """
+        Creates several habits and saves them to the database in a single transaction.
+
+        Args:
+            habits (iterable): An iterable of (name, frequency) tuples.
+
+        Returns:
+            list: The created Habit instances.
+        """
+        with self.database.transaction():
+            return [self.create_habit(name, frequency) for name, frequency in habits]
+
     def get_habit(self, name):
         """
         Retrieves a habit by name from the database.
@@ -138,6 +164,21 @@ class HabitOrganizer:
         else:
             raise ValueError(f"Habit '{name}' does not exist")
 
+    def habits_completed(self, names):
+        """
+        Marks several habits as completed in a single transaction.
+        If any of the habits does not exist, none of them are marked as completed.
+
+        Args:
+            names (iterable): The names of the habits to mark as completed.
+
+        Raises:
+            ValueError: If one of the habits does not exist in the database.
+        """
+        with self.database.transaction():
+            for name in names:
+                self.habit_completed(name)
+
     def delete_habit(self, name):
          """
         Deletes a habit from the database.
@@ -161,6 +202,15 @@ class HabitOrganizer:
         """
         return self.database.get_all_habits()
 
+    def iter_habits(self):
+        """
+        Yields all habits from the database one at a time.
+
+        Yields:
+            Habit: Each Habit instance stored in the database.
+        """
+        return self.database.iter_habits()
+
     def get_habits_ordered(self, frequency):
         """
         Retrieves all habits with the specified frequency, ordered by name.
@@ -1,5 +1,5 @@
 # test_analysis.py
-from analysis import longest_streak, habit_longest_streak
+from analysis import longest_streak, habit_longest_streak, filter_by_frequency, with_streaks, streaks_from_rows, top_streaks, streak_histogram
 from habit import Habit
 import datetime
 
@@ -80,3 +80,44 @@ def test_longest_streak_4_weeks():
     
     # Check that the longest streak is 28 days (habit1)
     assert longest_streak(habits) == habit1
+
+def test_streaming_pipeline():
+    """
+    Test the generator stages of the analysis module.
+    Feeds a generator of habits through the frequency filter and streak stages and checks the aggregates.
+    """
+    def make_habits():
+        # Yield three habits one at a time with streaks of 3, 1 and 2
+        for name, frequency, days in [("Exercise", "daily", 3), ("Reading", "daily", 1), ("Cleaning", "weekly", 2)]:
+            habit = Habit(name=name, frequency=frequency)
+            habit.habit_completed_dates = [
+                datetime.datetime.now() - datetime.timedelta(days=days - i) for i in range(days)
+            ]
+            yield habit
+
+    daily_streaks = with_streaks(filter_by_frequency(make_habits(), "daily"))
+
+    # Check that the top streaks are the daily habits, longest first
+    assert [(habit.name, streak) for habit, streak in top_streaks(daily_streaks, 2)] == [("Exercise", 3), ("Reading", 1)]
+
+    # Check the histogram of streak lengths over all habits
+    assert streak_histogram(with_streaks(make_habits())) == {3: 1, 1: 1, 2: 1}
+
+    # Check that the list-based wrapper accepts a generator too
+    assert longest_streak(make_habits()).name == "Exercise"
+
+def test_streaks_from_rows():
+    """
+    Test the streak calculation from raw (habit_id, frequency, completed_at) rows.
+    Simulates a daily habit with a 3 day streak and a weekly habit with a 2 week streak.
+    """
+    now = datetime.datetime.now()
+    rows = [
+        (1, "daily", now - datetime.timedelta(days=2)),
+        (1, "daily", now - datetime.timedelta(days=1)),
+        (1, "daily", now),
+        (2, "weekly", now - datetime.timedelta(weeks=1)),
+        (2, "weekly", now),
+    ]
+
+    assert list(streaks_from_rows(iter(rows))) == [(1, 3), (2, 2)]
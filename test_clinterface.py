@@ -0,0 +1,116 @@
+# test_clinterface.py
+import os
+import pytest
+from click.testing import CliRunner
+from clinterface import cli
+from database import Database
+from habit import HabitOrganizer
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    """
+    Fixture to run CLI commands in a temporary directory, so habits.db starts empty for each test.
+    """
+    monkeypatch.chdir(tmp_path)
+    return CliRunner()
+
+def test_habit_completed_many(runner):
+    """
+    Test for completing several habits with one command.
+    Checks that every named habit gets a completion, and that none do if one of the names does not exist.
+    """
+    runner.invoke(cli, ['add-habit', 'Exercise', 'daily'])
+    runner.invoke(cli, ['add-habit', 'Reading', 'weekly'])
+
+    result = runner.invoke(cli, ['habit-completed', 'Exercise', 'Reading'])
+    assert "Habit 'Exercise' completed!" in result.output
+    assert "Habit 'Reading' completed!" in result.output
+
+    # A batch with a missing habit is rolled back entirely
+    result = runner.invoke(cli, ['habit-completed', 'Exercise', 'Cooking'])
+    assert "Habit 'Cooking' does not exist" in result.output
+    assert [len(habit.habit_completed_dates) for habit in Database().get_all_habits()] == [1, 1]
+
+def test_add_habit_from_file(runner):
+    """
+    Test for adding habits from a CSV file.
+    Checks that the header row is skipped, that bad rows are reported,
+    and that NAME and FREQUENCY cannot be combined with --from-file.
+    """
+    with open('habits.csv', 'w') as f:
+        f.write("name,frequency\nExercise,daily\n\nGrocery Shopping,weekly\n")
+    with open('bad.csv', 'w') as f:
+        f.write("Bike\nReading,weekly\n")
+
+    result = runner.invoke(cli, ['add-habit', '--from-file', 'habits.csv'])
+    assert result.exit_code == 0
+    assert [habit.name for habit in Database().get_all_habits()] == ["Exercise", "Grocery Shopping"]
+
+    # A row without a frequency is reported and nothing is added
+    result = runner.invoke(cli, ['add-habit', '--from-file', 'bad.csv'])
+    assert result.exit_code == 2
+    assert "line 1" in result.output
+    assert len(Database().get_all_habits()) == 2
+
+    # A file with only the header has no habits to add
+    with open('empty.csv', 'w') as f:
+        f.write("name,frequency\n")
+    result = runner.invoke(cli, ['add-habit', '--from-file', 'empty.csv'])
+    assert result.exit_code == 2
+    assert "No habits found in empty.csv" in result.output
+
+    # NAME and FREQUENCY cannot be used together with --from-file
+    result = runner.invoke(cli, ['add-habit', 'Reading', 'weekly', '--from-file', 'habits.csv'])
+    assert result.exit_code == 2
+
+def test_shell(runner):
+    """
+    Test for running a script of commands with the shell command.
+    Checks that the commands share one organizer and that failing lines are reported without stopping the script.
+    """
+    script = (
+        "# A script of commands\n"
+        "add-habit Exercise daily\n"
+        "add-habit \"Read daily\n"
+        "habit-completed Cooking\n"
+        "bogus\n"
+        "habit-completed Exercise\n"
+        "analyze-habit Exercise\n"
+        "watch\n"
+        "watch --once\n"
+    )
+    result = runner.invoke(cli, ['shell'], input=script)
+
+    assert result.exit_code == 0
+    assert "Line 3:" in result.output  # Unclosed quote
+    assert "Habit 'Cooking' does not exist" in result.output
+    assert "Line 5:" in result.output  # Unknown command
+    assert "Habit 'Exercise' completed!" in result.output
+    assert "The longest streak for the habit 'Exercise' is 1 days" in result.output
+    assert "Line 8: The watch command needs --once inside the shell" in result.output
+    assert "save_completion\tExercise" in result.output  # watch --once still runs
+
+def test_commands_reuse_organizer(runner):
+    """
+    Test that commands run against the organizer passed in the click context instead of opening habits.db.
+    """
+    organizer = HabitOrganizer(Database(':memory:'))
+    runner.invoke(cli, ['add-habit', 'Exercise', 'daily'], obj=organizer)
+    runner.invoke(cli, ['habit-completed', 'Exercise'], obj=organizer)
+
+    assert not os.path.exists('habits.db')
+    assert len(organizer.get_habit('Exercise').habit_completed_dates) == 1
+
+def test_shell_abort(runner, monkeypatch):
+    """
+    Test that Ctrl-C during a command ends the shell instead of being reported as a failed line.
+    """
+    def interrupt(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(HabitOrganizer, 'create_habit', interrupt)
+    result = runner.invoke(cli, ['shell'], input="add-habit Exercise daily\nadd-habit Reading weekly\n")
+
+    assert result.exit_code == 1
+    assert "Aborted!" in result.output
+    assert "Line 1" not in result.output
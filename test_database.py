@@ -1,8 +1,9 @@
 # test_database.py
 import sqlite3
 import pytest
+import database
 from database import Database
-from habit import Habit
+from habit import Habit, HabitOrganizer
 import datetime
 
 @pytest.fixture
@@ -72,3 +73,230 @@ def test_daily_habit_4_weeks_db(db):
     print(saved_habit.habit_completed_dates)
     # Check that the streak is correct for 28 days  
     assert saved_habit.habit_streak() == 28
+
+def test_iter_habits(db):
+    """
+    Test for streaming habits from the database.
+    Checks that habits are yielded one at a time with their own completions, including habits with none.
+    """
+    # Create two habits and complete only the first one twice
+    habit = Habit(name="Exercise", frequency="daily")
+    db.save_habit(habit)
+    db.save_habit(Habit(name="Reading", frequency="weekly"))
+    for _ in range(2):
+        habit.complete_habit()
+        db.save_completion(habit)
+
+    habits = list(db.iter_habits())
+
+    # Check that each habit has only its own completions
+    assert [h.name for h in habits] == ["Exercise", "Reading"]
+    assert len(habits[0].habit_completed_dates) == 2
+    assert habits[1].habit_completed_dates == []
+
+    # Check that the raw completion rows match
+    assert [row[1:] for row in db.iter_completions()] == [("daily", date) for date in habits[0].habit_completed_dates]
+
+    # Check that the completions are read through the index without sorting
+    for query in ["SELECT c.habit_id, h.frequency, c.completed_at FROM Completions c JOIN Habits h ON h.id = c.habit_id "
+                  "ORDER BY c.habit_id, c.id",
+                  "SELECT h.id, c.completed_at FROM Habits h LEFT JOIN Completions c ON c.habit_id = h.id ORDER BY h.id, c.id"]:
+        plan = " ".join(row[3] for row in db.conn.execute("EXPLAIN QUERY PLAN " + query))
+        assert "TEMP B-TREE" not in plan
+
+def test_changes_since(db):
+    """
+    Test for the change log.
+    Checks that saving, completing and deleting a habit are each recorded with increasing sequence numbers,
+    and that only the changes after a given sequence number are returned.
+    """
+    # Create, complete and delete a habit
+    habit = Habit(name="Exercise", frequency="daily")
+    db.save_habit(habit)
+    habit.complete_habit()
+    db.save_completion(habit)
+    db.delete_habit("Exercise")
+
+    changes = list(db.changes_since(0))
+
+    # Check that all three changes were recorded in order
+    assert [change['operation'] for change in changes] == ['save_habit', 'save_completion', 'delete_habit']
+    assert [change['seq'] for change in changes] == sorted(change['seq'] for change in changes)
+    assert all(change['habit_name'] == "Exercise" for change in changes)
+
+    # Check that each change carries the data it wrote
+    assert changes[0]['frequency'] == "daily"
+    assert changes[0]['created_at'] == habit.created_at
+    assert changes[1]['completed_at'] == habit.habit_completed_dates[-1]
+
+    # Check that only the later changes are returned after a given sequence number
+    assert [change['operation'] for change in db.changes_since(changes[0]['seq'])] == ['save_completion', 'delete_habit']
+    assert list(db.changes_since(changes[-1]['seq'])) == []
+    assert db.current_seq() == changes[-1]['seq']
+
+def test_changes_backfill(tmp_path):
+    """
+    Test for opening a database created before the change log existed.
+    Checks that the existing habits and completions are added to the log and that
+    a full load returns the sequence number to follow the log from.
+    """
+    # Create a database with only the original tables
+    db_name = str(tmp_path / "old.db")
+    conn = sqlite3.connect(db_name)
+    conn.execute("CREATE TABLE Habits (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, "
+                 "frequency TEXT NOT NULL, created_at DATETIME NOT NULL)")
+    conn.execute("CREATE TABLE Completions (id INTEGER PRIMARY KEY AUTOINCREMENT, habit_id INTEGER, "
+                 "completed_at DATETIME NOT NULL)")
+    conn.execute("INSERT INTO Habits (name, frequency, created_at) VALUES ('Old', 'weekly', '2024-01-01 08:00:00')")
+    conn.execute("INSERT INTO Completions (habit_id, completed_at) VALUES (1, '2024-01-02 08:00:00')")
+    conn.commit()
+    conn.close()
+
+    db = Database(db_name)
+    changes = list(db.changes_since(0))
+
+    # Check that the existing habit and completion were backfilled
+    assert [(change['operation'], change['habit_name']) for change in changes] == [
+        ('save_habit', 'Old'), ('save_completion', 'Old')]
+    assert changes[0]['frequency'] == "weekly"
+    assert changes[1]['completed_at'] == datetime.datetime(2024, 1, 2, 8)
+
+    # Check that reopening the database does not backfill again
+    assert len(list(Database(db_name).changes_since(0))) == 2
+
+    # Check that a full load returns the sequence number to follow the log from
+    habits, seq = db.get_all_habits_with_seq()
+    assert [habit.name for habit in habits] == ["Old"]
+    assert seq == changes[-1]['seq']
+    db.save_habit(Habit(name="New", frequency="daily"))
+    assert [change['habit_name'] for change in db.changes_since(seq)] == ["New"]
+
+def test_snapshot(tmp_path):
+    """
+    Test for the read-only snapshot mode.
+    Checks that a snapshot sees the data at the time it was taken, rejects writes,
+    and picks up new data once refreshed.
+    """
+    db_name = str(tmp_path / "habits.db")
+    live = Database(db_name)
+    live.save_habit(Habit(name="Exercise", frequency="daily"))
+
+    # Take a snapshot, then add another habit to the live database
+    snapshot = Database(db_name, snapshot=True)
+    live.save_habit(Habit(name="Reading", frequency="weekly"))
+
+    # Check that the snapshot still shows the data at the time it was taken
+    assert [habit.name for habit in snapshot.get_all_habits()] == ["Exercise"]
+
+    # Check that the snapshot cannot be written to
+    with pytest.raises(sqlite3.OperationalError):
+        snapshot.save_habit(Habit(name="Cooking", frequency="daily"))
+
+    # Check that refreshing the snapshot picks up the new habit
+    snapshot.refresh_snapshot()
+    assert [habit.name for habit in snapshot.get_all_habits()] == ["Exercise", "Reading"]
+
+    # Check that a refresh interval of zero refreshes on every read
+    stale = Database(db_name, snapshot=True, refresh_interval=0)
+    live.delete_habit("Reading")
+    assert [habit.name for habit in stale.get_all_habits()] == ["Exercise"]
+
+def test_profile(tmp_path):
+    """
+    Test for the performance profiles.
+    Checks that the pragmas of a profile are applied to the connection and that unknown profiles are rejected.
+    """
+    db = Database(str(tmp_path / "habits.db"), profile='analytics')
+
+    # Check that the profile settings were applied
+    assert db.conn.execute('PRAGMA cache_size').fetchone()[0] == -256 * 1024
+    assert db.conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+    assert db.conn.execute('PRAGMA temp_store').fetchone()[0] == 2  # MEMORY
+    assert db.conn.execute('PRAGMA page_size').fetchone()[0] == 16384
+
+    # Check that the bulk profile does not sync to disk
+    bulk = Database(str(tmp_path / "bulk.db"), profile='bulk')
+    assert bulk.conn.execute('PRAGMA synchronous').fetchone()[0] == 0  # OFF
+
+    # Check that a snapshot applies the profile but keeps the page size of the source file
+    snapshot = Database(str(tmp_path / "bulk.db"), profile='analytics', snapshot=True)
+    assert snapshot.conn.execute('PRAGMA cache_size').fetchone()[0] == -256 * 1024
+    assert snapshot.conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+    assert snapshot.conn.execute('PRAGMA page_size').fetchone()[0] == 4096
+
+    # Check that an unknown profile raises an error
+    with pytest.raises(ValueError):
+        Database(':memory:', profile='turbo')
+
+def test_batch_transaction(db):
+    """
+    Test for completing several habits in one transaction.
+    Checks that a batch is saved together, and that nothing is saved if one of the habits does not exist.
+    """
+    organizer = HabitOrganizer(db)
+    organizer.create_habits([("Exercise", "daily"), ("Reading", "weekly")])
+
+    # Complete both habits in one batch
+    organizer.habits_completed(["Exercise", "Reading"])
+    assert [len(habit.habit_completed_dates) for habit in db.get_all_habits()] == [1, 1]
+
+    # A batch with a missing habit is rolled back entirely
+    with pytest.raises(ValueError):
+        organizer.habits_completed(["Exercise", "Cooking"])
+    assert [len(habit.habit_completed_dates) for habit in db.get_all_habits()] == [1, 1]
+
+def test_snapshot_edge_cases(tmp_path):
+    """
+    Test for snapshots of unusual database files.
+    Checks that a missing file is initialized, that paths with URI characters are opened correctly,
+    that refreshing does not break a read in progress, and that the in-memory option works.
+    """
+    # A snapshot of a database file that does not exist yet is empty, and does not create the file
+    assert Database(str(tmp_path / "new.db"), snapshot=True).get_all_habits() == []
+    assert not (tmp_path / "new.db").exists()
+
+    # A snapshot of an in-memory database is rejected
+    with pytest.raises(ValueError):
+        Database(':memory:', snapshot=True)
+
+    # A path containing '#' is copied from the right file
+    folder = tmp_path / "a#b"
+    folder.mkdir()
+    db_name = str(folder / "x.db")
+    live = Database(db_name)
+    live.save_habit(Habit(name="Exercise", frequency="daily"))
+    live.save_habit(Habit(name="Reading", frequency="weekly"))
+    snapshot = Database(db_name, snapshot=True, refresh_interval=0)
+    assert [habit.name for habit in snapshot.get_all_habits()] == ["Exercise", "Reading"]
+    assert not (tmp_path / "a").exists()
+
+    # Refreshing while a habit generator is still open does not fail
+    names = []
+    for habit in snapshot.iter_habits():
+        names.append(snapshot.get_habit(habit.name).name)
+    assert names == ["Exercise", "Reading"]
+
+    # The snapshot can be held in memory
+    in_memory = Database(db_name, snapshot=True, snapshot_in_memory=True)
+    assert in_memory.snapshot_path is None
+    assert [habit.name for habit in in_memory.get_all_habits()] == ["Exercise", "Reading"]
+
+def test_snapshot_locked(tmp_path, monkeypatch):
+    """
+    Test that taking a snapshot gives up instead of waiting forever while another connection locks the database.
+    """
+    monkeypatch.setattr(database, 'SNAPSHOT_BUSY_TIMEOUT', 0.2)
+    db_name = str(tmp_path / "habits.db")
+    Database(db_name).save_habit(Habit(name="Exercise", frequency="daily"))
+
+    # Hold an exclusive lock on the database from another connection
+    writer = sqlite3.connect(db_name, isolation_level=None)
+    writer.execute('BEGIN EXCLUSIVE')
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            Database(db_name, snapshot=True)
+    finally:
+        writer.execute('ROLLBACK')
+
+    # Once the lock is released the snapshot can be taken
+    assert [habit.name for habit in Database(db_name, snapshot=True).get_all_habits()] == ["Exercise"]